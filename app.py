@@ -1,13 +1,21 @@
-from flask import Flask, render_template, request, jsonify, send_file
-import pandas as pd
-import json
+from flask import Flask, render_template, request, jsonify, send_file, Response, g
+import orjson
 import os
+import stat
+import csv
+import io
+import math
+import atexit
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-import plotly.graph_objs as go
-import plotly.express as px
-from plotly.utils import PlotlyJSONEncoder
 import calendar
 
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; rely on the in-process lock
+    fcntl = None
+
 app = Flask(__name__)
 
 # File paths
@@ -15,131 +23,404 @@ EXPENSES_FILE = 'expenses.json'
 BUDGET_FILE = 'budget.json'
 INCOME_FILE = 'income.json'
 
+# Serializes data file writes across worker processes
+LOCK_FILE = '.data.lock'
+
+# Columns in exported CSV files
+CSV_FIELDS = ['id', 'date', 'category', 'amount', 'description']
+
+# Seconds to batch expense mutations before writing them to disk
+FLUSH_INTERVAL = 0.5
+
+# Monthly expense count above which the numba kernel beats the Python loop
+NUMBA_THRESHOLD = 5000
+
 # Categories
-CATEGORIES = ['Food', 'Transport', 'Shopping', 'Entertainment', 'Bills', 'Healthcare', 'Education', 'Other']
+CATEGORIES = ('Food', 'Transport', 'Shopping', 'Entertainment', 'Bills', 'Healthcare', 'Education', 'Other')
+
+# Template for a zeroed category -> amount mapping; copy it, never mutate it
+_ZERO_BUDGET = dict.fromkeys(CATEGORIES, 0)
+
+# Category-specific saving tips: category -> (monthly threshold, template)
+CATEGORY_TIPS = {
+    'Food': (300, "🍽️ Food expenses are ${:.2f} this month. Meal planning could save you 20-30%."),
+    'Transport': (200, "🚗 Transport costs ${:.2f}. Consider carpooling or public transit to save."),
+    'Entertainment': (150, "🎬 Entertainment: ${:.2f}. Look for free activities or share subscriptions."),
+    'Shopping': (250, "🛍️ Shopping: ${:.2f}. Try the 30-day rule before buying non-essentials.")
+}
+
+# In-memory cache of parsed data files: name -> (mtime_ns, data)
+_CACHE = {'expenses': (None, None), 'budget': (None, None), 'income': (None, None)}
+
+def _cached(name, path):
+    """Return (mtime, data) for a data file; data is None if the cache is stale"""
+    mtime = os.stat(path).st_mtime_ns
+    cached_mtime, data = _CACHE[name]
+    if cached_mtime == mtime:
+        return mtime, data
+    return mtime, None
+
+# Total of the most recently loaded or saved budget: (budget, total)
+_BUDGET_TOTAL = {'entry': (None, 0)}
+
+# Pending expense writes; generation bumps on every unflushed mutation
+_WRITE_BATCH = {'dirty': False, 'timer': None, 'generation': 0}
+
+# Number of data file saves by this process; part of the ETag so writes show
+# up even when the filesystem's mtime granularity hides them
+_SAVE_COUNT = {'count': 0}
+
+# Guards the caches, the write batch and mutation of the cached expenses
+# dict against request and flush threads; iterate expenses under it too
+_CACHE_LOCK = threading.RLock()
+
+# Serializes flushes so an older snapshot can't land on disk after a newer one
+_FLUSH_LOCK = threading.Lock()
+
+# numba kernel for large months, built on first use: None until tried,
+# False if numba isn't installed, else (numpy module, compiled kernel)
+_NUMBA = {'group_sum': None}
+
+# Next free expense id; ids are never reused after a deletion
+_NEXT_ID = {'expense': 1}
+
+# Encoded chart JSON and the ETag of the data it was built from: (etag, payload),
+# stored as one tuple so threads never pair a key with another entry's payload
+_VIZ_CACHE = {'entry': (None, None)}
+
+def _mtime(path):
+    """Return a file's mtime in nanoseconds, or None if it doesn't exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def has_non_finite(values):
+    """Whether any value is NaN or infinite; orjson would write those as null"""
+    return any(isinstance(value, float) and not math.isfinite(value) for value in values)
+
+def _check_finite(values, what):
+    """Refuse to write NaN/inf, which would load back as null and break analysis"""
+    if has_non_finite(values):
+        raise ValueError(f"{what} must be finite")
+
+def _store(name, path, data):
+    """Remember freshly saved data under the file's current mtime"""
+    _SAVE_COUNT['count'] += 1
+    try:
+        _CACHE[name] = (os.stat(path).st_mtime_ns, data)
+    except OSError:
+        _CACHE[name] = (None, None)
+
+@contextmanager
+def _file_lock():
+    """Hold an exclusive lock on the data files for the duration of a write"""
+    if fcntl is None:
+        yield
+        return
+    with open(LOCK_FILE, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _write_atomic(path, data):
+    """Write data to a temp file and rename it over path, so readers never see a partial file"""
+    tmp = path + '.tmp'
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = None
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # Keep whatever permissions the user set on the original file
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    # Make the rename itself durable where directories can be fsynced
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def _index_expenses(raw):
+    """Index a list of expenses by id, keeping file order"""
+    next_id = max((exp['id'] for exp in raw), default=0) + 1
+    expenses = {}
+    for exp in raw:
+        if exp['id'] in expenses:
+            # Older files could contain duplicate ids; give them fresh ones
+            exp['id'] = next_id
+            next_id += 1
+        expenses[exp['id']] = exp
+    _NEXT_ID['expense'] = max(_NEXT_ID['expense'], next_id)
+    return expenses
+
+def next_expense_id():
+    """Allocate a unique id for a new expense"""
+    with _CACHE_LOCK:
+        expense_id = _NEXT_ID['expense']
+        _NEXT_ID['expense'] += 1
+    return expense_id
 
 def load_expenses():
-    """Load expenses from JSON file"""
-    if os.path.exists(EXPENSES_FILE):
+    """Load expenses from JSON file as a dict of id -> expense"""
+    with _CACHE_LOCK:
+        if _WRITE_BATCH['dirty']:
+            return _CACHE['expenses'][1]
         try:
-            with open(EXPENSES_FILE, 'r') as f:
+            mtime, cached = _cached('expenses', EXPENSES_FILE)
+            if cached is not None:
+                return cached
+            with open(EXPENSES_FILE, 'rb') as f:
                 content = f.read()
-                if content.strip():
-                    return json.loads(content)
-        except json.JSONDecodeError:
-            print("Error reading expenses.json, returning empty list")
-            return []
-    return []
+        except FileNotFoundError:
+            return {}
+        if not content.strip():
+            return {}
+        try:
+            expenses = _index_expenses(orjson.loads(content))
+        except orjson.JSONDecodeError:
+            print("Error reading expenses.json, returning no expenses")
+            return {}
+        _CACHE['expenses'] = (mtime, expenses)
+        return expenses
 
 def save_expenses(expenses):
-    """Save expenses to JSON file"""
+    """Save expenses to JSON file; returns whether the write succeeded"""
     try:
-        with open(EXPENSES_FILE, 'w') as f:
-            json.dump(expenses, f, indent=2)
+        # Snapshot under the cache lock, but write and fsync outside it so
+        # readers aren't stalled behind the disk
+        with _CACHE_LOCK:
+            snapshot = list(expenses.values())
+        _check_finite([exp['amount'] for exp in snapshot], 'Expense amounts')
+        content = orjson.dumps(snapshot)
+        with _file_lock():
+            _write_atomic(EXPENSES_FILE, content)
+        with _CACHE_LOCK:
+            _store('expenses', EXPENSES_FILE, expenses)
+        return True
     except Exception as e:
         print(f"Error saving expenses: {e}")
+        return False
+
+def _schedule_flush():
+    """Arm the flush timer unless one is already pending; call under _CACHE_LOCK"""
+    if _WRITE_BATCH['timer'] is None:
+        timer = threading.Timer(FLUSH_INTERVAL, flush_expenses)
+        timer.daemon = True
+        timer.start()
+        _WRITE_BATCH['timer'] = timer
+
+def queue_save_expenses(expenses):
+    """Keep expenses in memory and schedule a batched write to disk"""
+    with _CACHE_LOCK:
+        _CACHE['expenses'] = (_CACHE['expenses'][0], expenses)
+        _WRITE_BATCH['dirty'] = True
+        _WRITE_BATCH['generation'] += 1
+        _schedule_flush()
+
+def flush_expenses():
+    """Write any pending expense changes to disk in one go; returns whether they are on disk"""
+    with _FLUSH_LOCK:
+        with _CACHE_LOCK:
+            if _WRITE_BATCH['timer'] is not None:
+                _WRITE_BATCH['timer'].cancel()
+                _WRITE_BATCH['timer'] = None
+            if not _WRITE_BATCH['dirty']:
+                return True
+            expenses = _CACHE['expenses'][1]
+            generation = _WRITE_BATCH['generation']
+        
+        if not save_expenses(expenses):
+            # Keep the changes pending and retry on the next tick
+            with _CACHE_LOCK:
+                _schedule_flush()
+            return False
+        
+        with _CACHE_LOCK:
+            # Mutations made during the write stay dirty for the next flush
+            if _WRITE_BATCH['generation'] == generation:
+                _WRITE_BATCH['dirty'] = False
+        return True
+
+atexit.register(flush_expenses)
 
 def load_budget():
     """Load budget from JSON file"""
-    if os.path.exists(BUDGET_FILE):
-        try:
-            with open(BUDGET_FILE, 'r') as f:
-                content = f.read()
-                if content.strip():
-                    return json.loads(content)
-        except json.JSONDecodeError:
-            print("Error reading budget.json, returning default budget")
-            return {cat: 0 for cat in CATEGORIES}
-    return {cat: 0 for cat in CATEGORIES}
+    try:
+        mtime, cached = _cached('budget', BUDGET_FILE)
+        if cached is not None:
+            return cached
+        with open(BUDGET_FILE, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return _ZERO_BUDGET.copy()
+    if not content.strip():
+        return _ZERO_BUDGET.copy()
+    try:
+        budget = orjson.loads(content)
+    except orjson.JSONDecodeError:
+        print("Error reading budget.json, returning default budget")
+        return _ZERO_BUDGET.copy()
+    _CACHE['budget'] = (mtime, budget)
+    return budget
 
 def save_budget(budget):
     """Save budget to JSON file"""
     try:
-        with open(BUDGET_FILE, 'w') as f:
-            json.dump(budget, f, indent=2)
+        _check_finite(budget.values(), 'Budget amounts')
+        with _file_lock():
+            _write_atomic(BUDGET_FILE, orjson.dumps(budget))
+        with _CACHE_LOCK:
+            _store('budget', BUDGET_FILE, budget)
     except Exception as e:
         print(f"Error saving budget: {e}")
 
+def budget_total(budget):
+    """Return the budget's total, summing it only once per budget object"""
+    cached_budget, total = _BUDGET_TOTAL['entry']
+    if cached_budget is not budget:
+        total = sum(budget.values())
+        _BUDGET_TOTAL['entry'] = (budget, total)
+    return total
+
 def load_income():
     """Load monthly income from JSON file"""
-    if os.path.exists(INCOME_FILE):
-        try:
-            with open(INCOME_FILE, 'r') as f:
-                content = f.read()
-                if content.strip():
-                    data = json.loads(content)
-                    return data.get('monthly_income', 0)
-        except json.JSONDecodeError:
-            print("Error reading income.json, returning 0")
-            return 0
-    return 0
+    try:
+        mtime, cached = _cached('income', INCOME_FILE)
+        if cached is not None:
+            return cached
+        with open(INCOME_FILE, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return 0
+    if not content.strip():
+        return 0
+    try:
+        monthly_income = orjson.loads(content).get('monthly_income', 0)
+    except orjson.JSONDecodeError:
+        print("Error reading income.json, returning 0")
+        return 0
+    _CACHE['income'] = (mtime, monthly_income)
+    return monthly_income
 
 def save_income(monthly_income):
     """Save monthly income to JSON file"""
     try:
-        with open(INCOME_FILE, 'w') as f:
-            json.dump({'monthly_income': monthly_income}, f, indent=2)
+        _check_finite([monthly_income], 'Monthly income')
+        with _file_lock():
+            _write_atomic(INCOME_FILE, orjson.dumps({'monthly_income': monthly_income}))
+        with _CACHE_LOCK:
+            _store('income', INCOME_FILE, monthly_income)
     except Exception as e:
         print(f"Error saving income: {e}")
 
+def data_etag(*paths):
+    """Build an ETag from the given data files' state and the current month"""
+    parts = [_mtime(path) for path in paths]
+    parts += [_WRITE_BATCH['generation'], _SAVE_COUNT['count'], g.ym_prefix]
+    return '-'.join(str(part) for part in parts)
+
+def not_modified(etag):
+    """Return a 304 response if the client already has this ETag, else None"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
 def get_current_month_expenses(expenses):
     """Filter expenses for current month only"""
     if not expenses:
         return []
     
-    now = datetime.now()
-    current_year = now.year
-    current_month = now.month
-    
-    monthly_expenses = []
-    for exp in expenses:
-        exp_date = datetime.strptime(exp['date'], '%Y-%m-%d')
-        if exp_date.year == current_year and exp_date.month == current_month:
-            monthly_expenses.append(exp)
+    # Snapshot under the lock; other request threads may be mutating expenses
+    with _CACHE_LOCK:
+        snapshot = list(expenses.values())
     
-    return monthly_expenses
+    # Dates are stored as 'YYYY-MM-DD', so a prefix match is enough
+    prefix = g.ym_prefix
+    return [exp for exp in snapshot if exp['date'].startswith(prefix)]
 
-def analyze_expenses(expenses, budget, monthly_income):
-    """Analyze expenses and generate insights for current month"""
-    
-    # Filter for current month only
-    monthly_expenses = get_current_month_expenses(expenses)
-    
-    # Get current month info
-    now = datetime.now()
-    month_name = calendar.month_name[now.month]
-    year = now.year
+def _group_sum(codes, amounts, out):
+    """Sum amounts into out by category code and return the grand total"""
+    total = 0.0
+    for i in range(codes.size):
+        out[codes[i]] += amounts[i]
+        total += amounts[i]
+    return total
+
+def _load_group_sum():
+    """Import numba and compile _group_sum the first time a large month needs it"""
+    if _NUMBA['group_sum'] is None:
+        try:
+            import numpy as np
+            from numba import njit
+        except ImportError:  # numba is optional; totals fall back to a Python loop
+            _NUMBA['group_sum'] = False
+        else:
+            _NUMBA['group_sum'] = (np, njit(cache=True)(_group_sum))
+    return _NUMBA['group_sum']
+
+def sum_by_category(monthly_expenses):
+    """Return (total, category -> total) for a list of expenses"""
+    count = len(monthly_expenses)
+    numba_path = _load_group_sum() if count > NUMBA_THRESHOLD else False
+    if numba_path:
+        np, group_sum = numba_path
+        index = {cat: i for i, cat in enumerate(CATEGORIES)}
+        codes = np.fromiter((index.setdefault(exp['category'], len(index)) for exp in monthly_expenses),
+                            dtype=np.int64, count=count)
+        amounts = np.fromiter((float(exp['amount']) for exp in monthly_expenses),
+                              dtype=np.float64, count=count)
+        sums = np.zeros(len(index))
+        total = group_sum(codes, amounts, sums)
+        return float(total), dict(zip(index, sums.tolist()))
+    
+    total = 0.0
+    category_totals = dict.fromkeys(CATEGORIES, 0.0)
+    for exp in monthly_expenses:
+        amount = float(exp['amount'])
+        total += amount
+        category_totals[exp['category']] = category_totals.get(exp['category'], 0.0) + amount
+    return total, category_totals
+
+def analyze_expenses(monthly_expenses, budget, total_budget, monthly_income, month_name, year):
+    """Analyze already-filtered current month expenses and generate insights"""
     
     if not monthly_expenses:
         return {
             'total_spent': 0,
-            'total_budget': sum(budget.values()),
-            'remaining': sum(budget.values()),
+            'total_budget': total_budget,
+            'remaining': total_budget,
             'monthly_income': monthly_income,
             'money_left': monthly_income,
-            'category_totals': {cat: 0 for cat in CATEGORIES},
+            'category_totals': _ZERO_BUDGET.copy(),
             'tips': ['Start logging your expenses to get personalized tips!'],
             'month_name': month_name,
             'year': year,
-            'savings': monthly_income - sum(budget.values()) if monthly_income > 0 else 0
+            'savings': monthly_income - total_budget if monthly_income > 0 else 0
         }
     
-    df = pd.DataFrame(monthly_expenses)
-    df['amount'] = pd.to_numeric(df['amount'])
-    
     # Calculate totals
-    total_spent = df['amount'].sum()
-    total_budget = sum(budget.values())
+    total_spent, category_totals = sum_by_category(monthly_expenses)
     remaining_budget = total_budget - total_spent
     money_left = monthly_income - total_spent
     planned_savings = monthly_income - total_budget if monthly_income > 0 else 0
     
-    # Category totals
-    category_totals = df.groupby('category')['amount'].sum().to_dict()
-    for cat in CATEGORIES:
-        if cat not in category_totals:
-            category_totals[cat] = 0
-    
     # Generate tips
     tips = generate_tips(category_totals, budget, total_spent, total_budget, monthly_income, money_left)
     
@@ -189,17 +470,10 @@ def generate_tips(category_totals, budget, total_spent, total_budget, monthly_in
             tips.append(f"💡 {category}: ${over:.2f} ({percentage:.1f}%) over budget. Try to cut back here.")
         
         # Specific category tips
-        if category == 'Food' and spent > 300:
-            tips.append(f"🍽️ Food expenses are ${spent:.2f} this month. Meal planning could save you 20-30%.")
-        
-        if category == 'Transport' and spent > 200:
-            tips.append(f"🚗 Transport costs ${spent:.2f}. Consider carpooling or public transit to save.")
-        
-        if category == 'Entertainment' and spent > 150:
-            tips.append(f"🎬 Entertainment: ${spent:.2f}. Look for free activities or share subscriptions.")
-        
-        if category == 'Shopping' and spent > 250:
-            tips.append(f"🛍️ Shopping: ${spent:.2f}. Try the 30-day rule before buying non-essentials.")
+        if category in CATEGORY_TIPS:
+            threshold, template = CATEGORY_TIPS[category]
+            if spent > threshold:
+                tips.append(template.format(spent))
     
     # Saving tips
     if total_budget > 0 and monthly_income > 0:
@@ -222,6 +496,15 @@ def generate_tips(category_totals, budget, total_spent, total_budget, monthly_in
     
     return tips[:6]  # Return top 6 tips
 
+@app.before_request
+def set_request_time():
+    """Read the clock once per request and derive the current month from it"""
+    now = datetime.now()
+    g.now = now
+    g.ym_prefix = now.strftime('%Y-%m')
+    g.month_name = calendar.month_name[now.month]
+    g.year = now.year
+
 @app.route('/')
 def index():
     """Render main page"""
@@ -230,18 +513,25 @@ def index():
 @app.route('/api/expenses', methods=['GET'])
 def get_expenses():
     """Get all expenses"""
+    etag = data_etag(EXPENSES_FILE, BUDGET_FILE, INCOME_FILE)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
     expenses = load_expenses()
     budget = load_budget()
     monthly_income = load_income()
-    analysis = analyze_expenses(expenses, budget, monthly_income)
     
     # Only return current month's expenses for display
     monthly_expenses = get_current_month_expenses(expenses)
+    analysis = analyze_expenses(monthly_expenses, budget, budget_total(budget), monthly_income, g.month_name, g.year)
     
-    return jsonify({
+    response = jsonify({
         'expenses': monthly_expenses,
         'analysis': analysis
     })
+    response.set_etag(etag)
+    return response
 
 @app.route('/api/expenses', methods=['POST'])
 def add_expense():
@@ -250,22 +540,29 @@ def add_expense():
         data = request.json
         print(f"Received expense data: {data}")
         
-        expenses = load_expenses()
-        
-        expense = {
-            'id': len(expenses) + 1,
-            'date': data.get('date', datetime.now().strftime('%Y-%m-%d')),
-            'category': data['category'],
-            'amount': float(data['amount']),
-            'description': data.get('description', '')
-        }
+        amount = float(data['amount'])
+        if has_non_finite([amount]):
+            return jsonify({
+                'success': False,
+                'error': 'Amount must be a finite number'
+            }), 400
         
-        expenses.append(expense)
-        save_expenses(expenses)
+        with _CACHE_LOCK:
+            expenses = load_expenses()
+            expense = {
+                'id': next_expense_id(),
+                'date': data.get('date', g.now.strftime('%Y-%m-%d')),
+                'category': data['category'],
+                'amount': amount,
+                'description': data.get('description', '')
+            }
+            expenses[expense['id']] = expense
+            queue_save_expenses(expenses)
         
         budget = load_budget()
         monthly_income = load_income()
-        analysis = analyze_expenses(expenses, budget, monthly_income)
+        monthly_expenses = get_current_month_expenses(expenses)
+        analysis = analyze_expenses(monthly_expenses, budget, budget_total(budget), monthly_income, g.month_name, g.year)
         
         print(f"Expense added successfully: {expense}")
         
@@ -284,19 +581,31 @@ def add_expense():
 @app.route('/api/expenses/<int:expense_id>', methods=['DELETE'])
 def delete_expense(expense_id):
     """Delete expense"""
-    expenses = load_expenses()
-    expenses = [e for e in expenses if e['id'] != expense_id]
-    save_expenses(expenses)
+    with _CACHE_LOCK:
+        expenses = load_expenses()
+        if expenses.pop(expense_id, None) is not None:
+            queue_save_expenses(expenses)
     
     budget = load_budget()
     monthly_income = load_income()
-    analysis = analyze_expenses(expenses, budget, monthly_income)
+    monthly_expenses = get_current_month_expenses(expenses)
+    analysis = analyze_expenses(monthly_expenses, budget, budget_total(budget), monthly_income, g.month_name, g.year)
     
     return jsonify({
         'success': True,
         'analysis': analysis
     })
 
+@app.route('/api/flush', methods=['POST'])
+def flush():
+    """Write pending expense changes to disk immediately"""
+    if not flush_expenses():
+        return jsonify({
+            'success': False,
+            'error': 'Could not write expenses to disk'
+        }), 500
+    return jsonify({'success': True})
+
 @app.route('/api/budget', methods=['GET'])
 def get_budget():
     """Get budget"""
@@ -306,11 +615,17 @@ def get_budget():
 def set_budget():
     """Set budget"""
     budget = request.json
+    if has_non_finite(budget.values()):
+        return jsonify({
+            'success': False,
+            'error': 'Budget amounts must be finite numbers'
+        }), 400
     save_budget(budget)
     
     expenses = load_expenses()
     monthly_income = load_income()
-    analysis = analyze_expenses(expenses, budget, monthly_income)
+    monthly_expenses = get_current_month_expenses(expenses)
+    analysis = analyze_expenses(monthly_expenses, budget, budget_total(budget), monthly_income, g.month_name, g.year)
     
     return jsonify({
         'success': True,
@@ -327,11 +642,17 @@ def set_income():
     """Set monthly income"""
     data = request.json
     monthly_income = float(data.get('monthly_income', 0))
+    if has_non_finite([monthly_income]):
+        return jsonify({
+            'success': False,
+            'error': 'Monthly income must be a finite number'
+        }), 400
     save_income(monthly_income)
     
     expenses = load_expenses()
     budget = load_budget()
-    analysis = analyze_expenses(expenses, budget, monthly_income)
+    monthly_expenses = get_current_month_expenses(expenses)
+    analysis = analyze_expenses(monthly_expenses, budget, budget_total(budget), monthly_income, g.month_name, g.year)
     
     return jsonify({
         'success': True,
@@ -339,24 +660,48 @@ def set_income():
         'analysis': analysis
     })
 
+def chart_response(payload, etag):
+    """Wrap encoded chart JSON in a response tagged with its ETag"""
+    response = Response(payload, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
 @app.route('/api/visualizations', methods=['GET'])
 def get_visualizations():
     """Generate visualizations for current month"""
+    etag = data_etag(EXPENSES_FILE, BUDGET_FILE)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    cached_etag, cached_payload = _VIZ_CACHE['entry']
+    if cached_etag == etag:
+        return chart_response(cached_payload, etag)
+    
     expenses = load_expenses()
     monthly_expenses = get_current_month_expenses(expenses)
     budget = load_budget()
     
     if not monthly_expenses:
-        return jsonify({'charts': {}})
+        payload = orjson.dumps({'charts': {}})
+        _VIZ_CACHE['entry'] = (etag, payload)
+        return chart_response(payload, etag)
     
-    df = pd.DataFrame(monthly_expenses)
-    df['amount'] = pd.to_numeric(df['amount'])
+    # Plotly is heavy to import, so only load it once charts are needed
+    import plotly.graph_objs as go
+    
+    # Category and daily totals in a single pass
+    category_totals = dict.fromkeys(CATEGORIES, 0.0)
+    daily_spending = {}
+    for exp in monthly_expenses:
+        amount = float(exp['amount'])
+        category_totals[exp['category']] = category_totals.get(exp['category'], 0.0) + amount
+        daily_spending[exp['date']] = daily_spending.get(exp['date'], 0.0) + amount
     
     # Category pie chart
-    category_totals = df.groupby('category')['amount'].sum()
+    spent_categories = [cat for cat, spent in category_totals.items() if spent]
     pie_chart = go.Figure(data=[go.Pie(
-        labels=category_totals.index,
-        values=category_totals.values,
+        labels=spent_categories,
+        values=[category_totals[cat] for cat in spent_categories],
         hole=0.3
     )])
     pie_chart.update_layout(title='Spending by Category (This Month)')
@@ -377,13 +722,12 @@ def get_visualizations():
         yaxis_title='Amount ($)'
     )
     
-    # Time series
-    df['date'] = pd.to_datetime(df['date'])
-    daily_spending = df.groupby('date')['amount'].sum().reset_index()
+    # Time series (ISO date strings sort chronologically)
+    dates = sorted(daily_spending)
     
     line_chart = go.Figure(data=go.Scatter(
-        x=daily_spending['date'],
-        y=daily_spending['amount'],
+        x=dates,
+        y=[daily_spending[date] for date in dates],
         mode='lines+markers'
     ))
     line_chart.update_layout(
@@ -392,13 +736,16 @@ def get_visualizations():
         yaxis_title='Amount ($)'
     )
     
-    return jsonify({
+    # Encode once with orjson rather than via jsonify
+    payload = orjson.dumps({
         'charts': {
-            'pie': json.loads(json.dumps(pie_chart, cls=PlotlyJSONEncoder)),
-            'bar': json.loads(json.dumps(bar_chart, cls=PlotlyJSONEncoder)),
-            'line': json.loads(json.dumps(line_chart, cls=PlotlyJSONEncoder))
+            'pie': pie_chart.to_plotly_json(),
+            'bar': bar_chart.to_plotly_json(),
+            'line': line_chart.to_plotly_json()
         }
-    })
+    }, option=orjson.OPT_SERIALIZE_NUMPY)
+    _VIZ_CACHE['entry'] = (etag, payload)
+    return chart_response(payload, etag)
 
 @app.route('/api/export', methods=['GET'])
 def export_data():
@@ -409,12 +756,16 @@ def export_data():
     if not monthly_expenses:
         return jsonify({'error': 'No expenses to export for this month'}), 400
     
-    df = pd.DataFrame(monthly_expenses)
-    now = datetime.now()
-    csv_file = f'expenses_{now.strftime("%B_%Y")}.csv'
-    df.to_csv(csv_file, index=False)
+    csv_file = f'expenses_{g.now.strftime("%B_%Y")}.csv'
+    
+    # Build the CSV in memory rather than writing it to disk
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(monthly_expenses)
     
-    return send_file(csv_file, as_attachment=True, download_name=csv_file)
+    return send_file(io.BytesIO(buffer.getvalue().encode('utf-8')), mimetype='text/csv',
+                     as_attachment=True, download_name=csv_file)
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.run(port=5000)
\ No newline at end of file
@@ -0,0 +1,14 @@
+# Gunicorn settings for running the app in production:
+#   gunicorn -c gunicorn_conf.py app:app
+import multiprocessing
+
+bind = '127.0.0.1:5000'
+
+# Expenses are cached and write-batched in process memory, so a single
+# worker process owns the data files; threads give request concurrency.
+workers = 1
+worker_class = 'gthread'
+threads = multiprocessing.cpu_count() * 2 + 1
+
+# Import the app (and its heavy dependencies) once in the master process
+preload_app = True
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+import app
+
+
+def reset_state(monkeypatch):
+    """Give the app fresh in-memory state, as if the process had just started"""
+    monkeypatch.setattr(app, '_CACHE', {'expenses': (None, None), 'budget': (None, None), 'income': (None, None)})
+    monkeypatch.setattr(app, '_WRITE_BATCH', {'dirty': False, 'timer': None, 'generation': 0})
+    monkeypatch.setattr(app, '_NEXT_ID', {'expense': 1})
+    monkeypatch.setattr(app, '_VIZ_CACHE', {'entry': (None, None)})
+    monkeypatch.setattr(app, '_BUDGET_TOTAL', {'entry': (None, 0)})
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client working on empty data files in a temp directory"""
+    monkeypatch.chdir(tmp_path)
+    # Keep the flush timer out of the way; tests flush explicitly
+    monkeypatch.setattr(app, 'FLUSH_INTERVAL', 60)
+    reset_state(monkeypatch)
+    yield app.app.test_client()
+    if app._WRITE_BATCH['timer'] is not None:
+        app._WRITE_BATCH['timer'].cancel()
+
+
+def add(client, amount, category='Food'):
+    response = client.post('/api/expenses', json={'category': category, 'amount': amount})
+    assert response.status_code == 200
+    return response.get_json()['expense']
+
+
+def test_add_flush_reload_round_trip(client, monkeypatch):
+    expense = add(client, 12.5)
+    # Writes are batched, so nothing is on disk until the flush
+    assert app._WRITE_BATCH['dirty']
+
+    response = client.post('/api/flush')
+    assert response.get_json() == {'success': True}
+    with open(app.EXPENSES_FILE) as f:
+        assert json.load(f) == [expense]
+
+    reset_state(monkeypatch)
+    expenses = client.get('/api/expenses').get_json()['expenses']
+    assert expenses == [expense]
+
+
+def test_ids_not_reused_after_delete(client):
+    ids = [add(client, amount)['id'] for amount in (1, 2, 3)]
+    client.delete(f'/api/expenses/{ids[1]}')
+    client.delete(f'/api/expenses/{ids[2]}')
+
+    new_id = add(client, 4)['id']
+    assert new_id not in ids
+    listed = [exp['id'] for exp in client.get('/api/expenses').get_json()['expenses']]
+    assert listed == [ids[0], new_id]
+
+
+def test_duplicate_ids_renumbered_on_load(client):
+    with open(app.EXPENSES_FILE, 'w') as f:
+        json.dump([
+            {'id': 1, 'date': '2020-01-01', 'category': 'Food', 'amount': 1.0, 'description': ''},
+            {'id': 1, 'date': '2020-01-02', 'category': 'Food', 'amount': 2.0, 'description': ''},
+        ], f)
+
+    expenses = app.load_expenses()
+    assert sorted(expenses) == [1, 2]
+    assert app.next_expense_id() == 3
+
+
+def test_etag_not_modified_until_mutation(client):
+    first = client.get('/api/expenses')
+    etag = first.headers['ETag']
+
+    cached = client.get('/api/expenses', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+
+    add(client, 5)
+    fresh = client.get('/api/expenses', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.headers['ETag'] != etag
+
+
+def test_failed_flush_stays_dirty(client, monkeypatch):
+    expense = add(client, 7)
+    write_atomic = app._write_atomic
+
+    def fail(path, data):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(app, '_write_atomic', fail)
+    response = client.post('/api/flush')
+    assert response.status_code == 500
+    assert app._WRITE_BATCH['dirty']
+    assert app._WRITE_BATCH['timer'] is not None
+
+    monkeypatch.setattr(app, '_write_atomic', write_atomic)
+    assert client.post('/api/flush').status_code == 200
+    assert not app._WRITE_BATCH['dirty']
+    with open(app.EXPENSES_FILE) as f:
+        assert json.load(f) == [expense]